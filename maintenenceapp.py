@@ -1,263 +1,456 @@
 import streamlit as st
 import spacy
+import functools
+import os
 import re
 import calendar
 import dateparser
+import numpy as np
+from dateparser.date import DateDataParser
 from dateparser.search import search_dates
 from datetime import datetime, timedelta, date
-import spacy.cli
+from spacy.attrs import LOWER, POS
+from spacy.lang.en.stop_words import STOP_WORDS
+from spacy.strings import hash_string
+from spacy.symbols import NOUN
 
-# load SpaCy
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    spacy.cli.download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+# load SpaCy (only tagger + attribute_ruler for POS and ner for DATE ents are used,
+# the parser and lemmatizer are dead weight on every nlp() call)
+SPACY_EXCLUDE = ["parser", "lemmatizer"]
 
-# task categories and hint words
+# loaded once per process and shared by every rerun/session; the model wheel is
+# pinned in requirements.txt, so there is no download on the request path. Loaded
+# (and warmed) at startup like dateparser below, so a missing model fails before
+# the first parse click and that click doesn't pay for the load
+@st.cache_resource
+def load_nlp():
+    model = spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)
+    model("warm up the pipeline")  # first call allocates the model's buffers
+    return model
+
+load_nlp()
+
+# extract_asset and extract_date both fall back to spaCy; when no Doc is handed in,
+# parse the sentence at most once and let the second fallback reuse it
+@functools.lru_cache(maxsize=256)
+def get_doc(text):
+    return load_nlp()(text)
+
+# how many lines nlp.pipe() parses per batch in the UI, and over how many worker
+# processes (-1 = one per CPU; only pays off for very large pastes)
+SPACY_BATCH_SIZE = int(os.environ.get("SPACY_BATCH_SIZE", 64))
+SPACY_N_PROCESS = int(os.environ.get("SPACY_N_PROCESS", 1))
+
+# set USE_SPACY_NOUNS=0 to pick the fallback asset with a stop-word heuristic
+# instead of the tagger's first NOUN (cheaper, but a rougher guess)
+USE_SPACY_NOUNS = os.environ.get("USE_SPACY_NOUNS", "1") != "0"
+
+# task categories and hint words (read-only tables, so tuples / frozensets)
 TASK_CATEGORIES = {
-    'electrical': [
+    'electrical': (
         'emergency exit sign', 'exit sign',
         'electrical','light','lights','bulb','bulbs',
         'fixture','fixtures','outlet','socket','switch',
         'wire','wiring','cable','sign'
-    ],
-    'plumbing':   ['leak','pipe','pipes','toilet','sink','sinks','faucet'],
-    'hvac':       ['ac','air conditioner','vent','vents','cooling','heater','duct','ductwork'],
-    'carpentry':  ['door','window','handle','frame','handrail','ladder','drywall'],
-    'general':    ['broken','fix','repair','generator']
+    ),
+    'plumbing':   ('leak','pipe','pipes','toilet','sink','sinks','faucet'),
+    'hvac':       ('ac','air conditioner','vent','vents','cooling','heater','duct','ductwork'),
+    'carpentry':  ('door','window','handle','frame','handrail','ladder','drywall'),
+    'general':    ('broken','fix','repair','generator')
 }
 
 # too generic words to drop when something more specific is found
-GENERIC_ASSETS = {
+GENERIC_ASSETS = frozenset({
     'broken','fix','repair','leak','fluorescent',
     'thing','unit','component','device','fixture',
     'system','apparatus','equipment','object','item',
     'hardware','part'
-}
+})
+# the same words as spaCy LOWER hashes, for masking Doc.to_array() output
+# (hash_string is what the vocab's StringStore hashes with, so it needs no nlp handle)
+GENERIC_ASSET_IDS = np.array([hash_string(w) for w in GENERIC_ASSETS], dtype=np.uint64)
 
 # priority keywords
 PRIORITY_KEYWORDS = {
-    'high':   ['high priority','urgent','asap','immediately','emergency','critical','immediate attention'],
-    'medium': ['medium priority','normal priority','soon','quick','needs attention'],
-    'low':    ['low priority','whenever','no rush','sometime','can wait','minor','not a big deal']
+    'high':   ('high priority','urgent','asap','immediately','emergency','critical','immediate attention'),
+    'medium': ('medium priority','normal priority','soon','quick','needs attention'),
+    'low':    ('low priority','whenever','no rush','sometime','can wait','minor','not a big deal')
+}
+
+# precompiled patterns (built once at import instead of on every call)
+def kw_trie(kws):
+    # factor the keywords into a prefix trie ('light(?:s)?', 'pipe(?:s)?', ...) so the
+    # regex engine walks shared prefixes once, aho-corasick style, instead of retrying
+    # every alternative at each position; longer keywords win over their prefixes
+    trie = {}
+    for kw in kws:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def walk(node):
+        alts = [re.escape(ch) + walk(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ''
+        body = alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return walk(trie)
+
+def kw_alternation(kws):
+    return r'\b(?:' + kw_trie(kws) + r')\b'
+
+# one scan per text: the named group that matched (m.lastgroup) is the category/level
+CATEGORY_RE = re.compile(r'|'.join(rf'(?P<{cat}>{kw_alternation(kws)})' for cat, kws in TASK_CATEGORIES.items()),
+                         re.IGNORECASE)
+ASSET_PHRASE_RE = tuple(re.compile(re.escape(p), re.IGNORECASE) for p in ('emergency exit sign', 'exit sign'))
+# priority overrides come first, then the PRIORITY_KEYWORDS levels; the first group
+# (in this order) seen anywhere in the text decides the level
+PRIORITY_RANKS = {
+    'emergency':  'High',  # temporary fix for "emergency signs"
+    'minor':      'Low',
+    'not_urgent': 'Low',
+    **{lvl: lvl.capitalize() for lvl in PRIORITY_KEYWORDS},
+}
+PRIORITY_RE = re.compile(
+    r'(?P<emergency>\bemergency\b(?!\s+exit))'
+    r'|(?P<minor>\b(?:minor|not a big deal)\b)'
+    r'|(?P<not_urgent>\bnot\s+(?:urgent|high priority|critical)\b)|'
+    + r'|'.join(rf'(?P<{lvl}>{kw_alternation(kws)})' for lvl, kws in PRIORITY_KEYWORDS.items()),
+    re.IGNORECASE
+)
+
+# one pass over the text for every location cue; the alternatives sit inside a
+# lookahead so cues that overlap without sharing a start ("suite 204" -> suite +
+# room) are all still seen. The alternation can only report one cue per start
+# position, and a bare room number can start a floor cue ("204 floor"), so the
+# room cue gets its own search (ROOM_RE) instead of a group here
+LOC_RE = re.compile(
+    r'(?=(?P<bldg>\b(?:building|bldg\.?)\s*[A-Z]\b)'
+    r'|(?P<suite>\b(?:suite|ste)\s*(?P<suite_no>\d+)\b)'
+    r'|(?P<floor>\b\d+(?:st|nd|rd|th)?\s+floor\b)'
+    r'|(?P<stair>\bstairs?\s*(?P<stair_no>\d+)\b)'
+    r'|(?P<street>(?-i:\bon\s+(?P<street_name>[A-Z][\w\s]*?(?:Street|St\.?|Avenue|Ave\.?|Road|Rd\.?))\b))'
+    r'|(?P<elevator>\bnear\s+the\s+(?P<elevator_name>[\w\s]+?elevator)\b)'
+    r'|(?P<hall>\bresidence hall\b)'
+    r'|(?P<corridor>\bcorridor\s*(?P<corridor_no>\d+)\b)'
+    r'|(?P<wing>\b(?P<wing_dir>north|south|east|west)\s+wing\b)'
+    r'|(?P<wall>\b(?P<wall_dir>north|south|east|west)\s+wall\b)'
+    r'|(?P<lobby>\blobby\b))',
+    re.IGNORECASE
+)
+ROOM_RE = re.compile(r'(?P<room>\b(?:room\s*\d+|\d{3})\b)', re.IGNORECASE)
+
+# output order and formatting of each location part
+LOC_PARTS = {
+    'bldg':     lambda m: m['bldg'],
+    'suite':    lambda m: f"suite {m['suite_no']}",
+    'room':     lambda m: m['room'],
+    'floor':    lambda m: m['floor'],
+    'stair':    lambda m: f"Stair {m['stair_no']}",
+    'street':   lambda m: m['street_name'],
+    'elevator': lambda m: m['elevator_name'].lower(),
+    'hall':     lambda m: 'residence hall',
+    'corridor': lambda m: f"corridor {m['corridor_no']}",
+    'wing':     lambda m: f"{m['wing_dir'].lower()} wing",
+    'wall':     lambda m: f"{m['wall_dir'].lower()} wall",
+    'lobby':    lambda m: 'lobby',
 }
 
-# holiday helpers (festive deadlines)
+WEEKDAYS = r'(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)'
+MONTH_NAMES = tuple(calendar.month_name[1:])
+# every rule-based deadline in one scan; extract_date tries the groups in this order
+DATE_RE = re.compile(
+    r'(?P<eom>\bend of (?:this|current) month\b)'
+    r'|(?P<holiday>\b(?P<hol_next>next\s+)?(?P<hol_name>thanksgiving|christmas|new year(?:\'s)? day|new year|'
+    r'valentine(?:’s|s) day|labor day|memorial day|president(?:s)? day|'
+    r'martin luther king jr\.? day|columbus day|veterans day)\b)'
+    rf'|(?P<explicit>\b(?P<exp_day>\d{{1,2}})(?:st|nd|rd|th)(?:\s+of)?\s+(?P<exp_month>{"|".join(MONTH_NAMES)})\b)'
+    rf'|(?P<by>\bby\s+(?P<by_wd>{WEEKDAYS})\b)'
+    rf'|(?P<after_next>\bafter\s+next\s+(?P<aft_wd>{WEEKDAYS})\b)'
+    rf'|(?P<before>\bbefore\s+(?P<bf_qual>next|last)\s+(?P<bf_wd>{WEEKDAYS})\b)',
+    re.IGNORECASE
+)
+# any date-like word at all; only consulted once none of the DATE_RE rules applied
+DATE_HINT_RE = re.compile(
+    r'\b(?:by\s+)?(?:mon(?:day)?|tue(?:sday)?|wed(?:nesday)?|'
+    r'thu(?:rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?|'
+    r'january|february|march|april|may|june|july|august|'
+    r'september|october|november|december|next|last|'
+    r'tomorrow|yesterday|\d+(?:st|nd|rd|th))\b', re.IGNORECASE
+)
+OTHER_DAY_RE  = re.compile(r'other day', re.IGNORECASE)
+ISO_DATE_RE   = re.compile(r'\d{4}-\d{2}-\d{2}')
+POSSESSIVE_RE = re.compile(r"'s$")
+NON_WORD_RE   = re.compile(r'\W+')
+
+# lookups for the hand-rolled weekday / "15th of july" date arithmetic
+WEEKDAY_IDX = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+               'friday': 4, 'saturday': 5, 'sunday': 6}
+MONTH_IDX = {name.lower(): i for i, name in enumerate(MONTH_NAMES, 1)}
+
+# holiday helpers (festive deadlines); pure calendar math, so memoized
+@functools.lru_cache(maxsize=256)
 def nth_weekday(year, month, weekday, n):
     first = date(year, month, 1)
     offset = (weekday - first.weekday() + 7) % 7
     return first + timedelta(days=offset + 7*(n-1))
 
+@functools.lru_cache(maxsize=256)
 def last_weekday(year, month, weekday):
     last = calendar.monthrange(year, month)[1]
     d = date(year, month, last)
     return d - timedelta(days=(d.weekday() - weekday) % 7)
 
+def next_weekday(now, name):
+    # matches dateparser's PREFER_DATES_FROM='future': today's weekday means a week out
+    return now.date() + timedelta(days=(WEEKDAY_IDX[name] - now.weekday()) % 7 or 7)
+
+# maintenance notes are English; naming the language skips dateparser's detection
+# pass and its tries against every other installed locale. Only used for parsing a
+# date phrase: on whole sentences search_dates reads bare ordinals ("on the 12th")
+# differently once detection is off, so it keeps the default
+DATEPARSER_LANGUAGES = ['en']
+
+# dateparser.parse() builds a fresh DateDataParser (settings, locale setup) on every
+# call with non-default settings; keep one per reference time and preference instead
+@functools.lru_cache(maxsize=8)
+def date_data_parser(now, prefer_future=False):
+    settings = {'RELATIVE_BASE': now}
+    if prefer_future:
+        settings['PREFER_DATES_FROM'] = 'future'
+    return DateDataParser(languages=DATEPARSER_LANGUAGES, settings=settings)
+
+# dateparser is the slowest step left; Streamlit re-executes the script (and so
+# redefines this cache) on every rerun, so it only dedupes repeated phrases within
+# one parse click, where they share the same reference time
+@functools.lru_cache(maxsize=1024)
+def cached_dateparse(expr, now, prefer_future=False):
+    return date_data_parser(now, prefer_future).get_date_data(expr)['date_obj']
+
+# dateparser builds its locale data and parser caches on first use; pay that once
+# per process at startup instead of on the first parse click
+@st.cache_resource
+def warm_dateparser():
+    dateparser.parse("1 January 2024", languages=DATEPARSER_LANGUAGES)
+    search_dates("next Monday")
+
+warm_dateparser()
+
+def parse_date_text(s, now):
+    # ISO dates don't need dateparser's locale/format search at all
+    if ISO_DATE_RE.fullmatch(s):
+        try:
+            return date.fromisoformat(s)
+        except ValueError:
+            pass
+    p = cached_dateparse(s, now, prefer_future=True)
+    return p.date() if p else None
+
+# normalized holiday name -> date builder for a given year
+HOLIDAY_DATES = {
+    "thanksgiving":              lambda y: nth_weekday(y, 11, 3, 4),
+    "christmas":                 lambda y: date(y, 12, 25),
+    "new year day":              lambda y: date(y, 1, 1),
+    "new year":                  lambda y: date(y, 1, 1),
+    "valentine day":             lambda y: date(y, 2, 14),
+    "valentines day":            lambda y: date(y, 2, 14),
+    "labor day":                 lambda y: nth_weekday(y, 9, 0, 1),
+    "memorial day":              lambda y: last_weekday(y, 5, 0),
+    "president day":             lambda y: nth_weekday(y, 2, 0, 3),
+    "presidents day":            lambda y: nth_weekday(y, 2, 0, 3),
+    "martin luther king jr day": lambda y: nth_weekday(y, 1, 0, 3),
+    "columbus day":              lambda y: nth_weekday(y, 10, 0, 2),
+    "veterans day":              lambda y: date(y, 11, 11),
+}
+HOLIDAY_NAME_TABLE = str.maketrans({"’": "'", ".": None})
+
+@functools.lru_cache(maxsize=256)
 def get_holiday_date(name, year):
-    nm = name.lower().replace("’","'").replace(".", "").strip()
-    nm = re.sub(r"'s$", "", nm)
-    if nm == "thanksgiving":            return nth_weekday(year, 11, 3, 4)
-    if nm == "christmas":               return date(year, 12, 25)
-    if nm in ("new year day","new year"): return date(year, 1, 1)
-    if nm in ("valentine day","valentines day"): return date(year, 2, 14)
-    if nm == "labor day":               return nth_weekday(year, 9, 0, 1)
-    if nm == "memorial day":            return last_weekday(year, 5, 0)
-    if nm in ("president day","presidents day"): return nth_weekday(year, 2, 0, 3)
-    if nm == "martin luther king jr day": return nth_weekday(year, 1, 0, 3)
-    if nm == "columbus day":            return nth_weekday(year, 10, 0, 2)
-    if nm == "veterans day":            return date(year, 11, 11)
-    return None
+    nm = POSSESSIVE_RE.sub("", name.lower().translate(HOLIDAY_NAME_TABLE).strip())
+    build = HOLIDAY_DATES.get(nm)
+    return build(year) if build else None
 
 def extract_location(text):
-    lower = text.lower()
-    bldg     = re.search(r'\b(?:building|bldg\.?)\s*[A-Z]\b', text, re.IGNORECASE)
-    suite    = re.search(r'\b(?:suite|ste)\s*(\d+)\b',      text, re.IGNORECASE)
-    room     = re.search(r'\b(room\s*\d+|\d{3})\b',         text, re.IGNORECASE)
-    floor    = re.search(r'\b\d+(?:st|nd|rd|th)?\s+floor\b', text, re.IGNORECASE)
-    stair    = re.search(r'\bstairs?\s*(\d+)\b',            lower)
-    street   = re.search(r'\bon\s+([A-Z][\w\s]*?(?:Street|St\.?|Avenue|Ave\.?|Road|Rd\.?))\b', text)
-    elevator = re.search(r'\bnear\s+the\s+([\w\s]+?elevator)\b', lower)
-    hall     = re.search(r'\bresidence hall\b',             lower)
-    corridor = re.search(r'\bcorridor\s*(\d+)\b',           lower)
-    wing     = re.search(r'\b(north|south|east|west)\s+wing\b', lower)
-    wall     = re.search(r'\b(north|south|east|west)\s+wall\b', lower)
-    lobby    = re.search(r'\blobby\b',                      lower)
-
-    parts = []
-    if bldg:     parts.append(bldg.group(0))
-    if suite:    parts.append(f"suite {suite.group(1)}")
-    if room:     parts.append(room.group(0))
-    if floor:    parts.append(floor.group(0))
-    if stair:    parts.append(f"Stair {stair.group(1)}")
-    if street:   parts.append(street.group(1))
-    if elevator: parts.append(elevator.group(1))
-    if hall:     parts.append('residence hall')
-    if corridor: parts.append(f"corridor {corridor.group(1)}")
-    if wing:     parts.append(f"{wing.group(1)} wing")
-    if wall:     parts.append(f"{wall.group(1)} wall")
-    if lobby:    parts.append('lobby')
+    # first occurrence of each kind of cue, reported in LOC_PARTS order
+    found = {}
+    for m in LOC_RE.finditer(text):
+        found.setdefault(m.lastgroup, m)
+    room = ROOM_RE.search(text)
+    if room:
+        found['room'] = room
+    parts = [fmt(found[kind]) for kind, fmt in LOC_PARTS.items() if kind in found]
     return " | ".join(parts) if parts else None
 
-def extract_task_type(text):
-    txt = text.lower()
-    for cat, kws in TASK_CATEGORIES.items():
-        for kw in kws:
-            if re.search(rf'\b{re.escape(kw)}\b', txt):
-                return cat.capitalize()
-    return "General"
+# task type, asset and needs_nlp all read the same keyword hits; scan each text once
+@functools.lru_cache(maxsize=4096)
+def category_hits(text):
+    return tuple(CATEGORY_RE.finditer(text))
 
-def extract_asset(text, task_type):
-    txt = text.lower()
-    kws = TASK_CATEGORIES.get(task_type.lower(), [])
+def extract_task_type(text):
+    found = {m.lastgroup for m in category_hits(text)}
+    for cat in TASK_CATEGORIES:
+        if cat in found:
+            return cat
+    return "general"
 
+def extract_asset(text, cat, doc=None):
     # multi-word assets first
-    for phrase in ['emergency exit sign', 'exit sign']:
-        if phrase in txt:
-            return phrase
-
-    # door handle should stay intact (compound words)
-    comp = re.search(r'\b(' + r'|'.join(map(re.escape, kws)) + r')\s+(' + r'|'.join(map(re.escape, kws)) + r')\b', txt)
-    if comp:
-        return f"{comp.group(1)} {comp.group(2)}"
-
-    # earliest specific keyword
-    hits = [(m.start(), kw) for kw in kws for m in re.finditer(rf'\b{re.escape(kw)}\b', txt)]
-    if len(hits) > 1:
-        spec = [h for h in hits if h[1] not in GENERIC_ASSETS]
-        if spec:
-            hits = spec
-    if hits:
-        return min(hits, key=lambda x: x[0])[1]
-
-    # fallback to any category keyword
-    all_hits = [(m.start(), kw)
-                for cat in TASK_CATEGORIES.values()
-                for kw in cat
-                for m in re.finditer(rf'\b{re.escape(kw)}\b', txt)]
-    if len(all_hits) > 1:
-        spec = [h for h in all_hits if h[1] not in GENERIC_ASSETS]
-        if spec:
-            all_hits = spec
-    if all_hits:
-        return min(all_hits, key=lambda x: x[0])[1]
+    for phrase_re in ASSET_PHRASE_RE:
+        phrase = phrase_re.search(text)
+        if phrase:
+            return phrase.group().lower()
+
+    # the keyword scan feeds the compound check and both keyword tiers below
+    found = category_hits(text)
+
+    # door handle should stay intact (compound words): two same-category keywords
+    # separated only by whitespace
+    for a, b in zip(found, found[1:]):
+        if a.lastgroup == b.lastgroup == cat and text[a.end():b.start()].isspace():
+            return f"{a.group().lower()} {b.group().lower()}"
+
+    # earliest specific keyword of the task's category, else of any category; a
+    # lone hit is kept even if generic. finditer yields hits in text order, so the
+    # first non-generic one found while streaming is the earliest
+    kws = [m.group().lower() for m in found]
+    cat_kws = [kw for m, kw in zip(found, kws) if m.lastgroup == cat]
+    for pool in (cat_kws, kws):
+        if len(pool) == 1:
+            return pool[0]
+        if pool:
+            return next((kw for kw in pool if kw not in GENERIC_ASSETS), pool[0])
 
     # final fallback: first decent noun
-    doc = nlp(text)
-    for tok in doc:
-        if tok.pos_ == 'NOUN' and tok.text.lower() not in GENERIC_ASSETS:
-            return tok.text
-    for tok in doc:
-        if tok.pos_ == 'NOUN':
-            return tok.text
+    if not USE_SPACY_NOUNS:
+        for w in NON_WORD_RE.split(text):
+            wl = w.lower()
+            if len(w) > 2 and not w.isdigit() and wl not in GENERIC_ASSETS and wl not in STOP_WORDS:
+                return w
+        return None
+    if doc is None:
+        doc = get_doc(text)
+    attrs = doc.to_array([POS, LOWER])
+    nouns = attrs[:, 0] == NOUN
+    for idx in (np.flatnonzero(nouns & ~np.isin(attrs[:, 1], GENERIC_ASSET_IDS)), np.flatnonzero(nouns)):
+        if idx.size:
+            return doc[int(idx[0])].text
     return None
 
 def extract_priority(text):
-    txt = text.lower()
-    # temporary fix for "emergency signs"
-    if re.search(r'\bemergency\b(?!\s+exit)', txt):
-        return "High"
-    if re.search(r'\b(minor|not a big deal)\b', txt):
-        return "Low"
-    if re.search(r'\bnot\s+(?:urgent|high priority|critical)\b', txt):
-        return "Low"
-    for lvl, kws in PRIORITY_KEYWORDS.items():
-        for kw in kws:
-            if re.search(rf'\b{re.escape(kw)}\b', txt):
-                return lvl.capitalize()
+    found = {m.lastgroup for m in PRIORITY_RE.finditer(text)}
+    for group, lvl in PRIORITY_RANKS.items():
+        if group in found:
+            return lvl
     return "Medium"
 
-def extract_date(text):
-    txt = text.lower()
-    now = datetime.now()
+# returns a date (or None); turning it into text is left to whatever displays it
+def extract_date(text, doc=None, now=None):
+    if now is None:
+        now = datetime.now()
+
+    # first hit of each rule
+    rules = {}
+    for m in DATE_RE.finditer(text):
+        rules.setdefault(m.lastgroup, m)
 
     # end-of-month
-    if re.search(r'\bend of (?:this|current) month\b', txt):
+    if 'eom' in rules:
         y, m = now.year, now.month
         last = calendar.monthrange(y, m)[1]
-        return str(date(y, m, last))
+        return date(y, m, last)
 
     # holiday deadlines
-    hol = re.search(
-        r'\b(next\s+)?(thanksgiving|christmas|new year(?:\'s)? day|new year|'
-        r'valentine(?:’s|s) day|labor day|memorial day|president(?:s)? day|'
-        r'martin luther king jr\.? day|columbus day|veterans day)\b', txt
-    )
+    hol = rules.get('holiday')
     if hol:
-        qual, name = hol.group(1), hol.group(2)
+        qual, name = hol['hol_next'], hol['hol_name']
         yr = now.year + (1 if qual else 0)
         hd = get_holiday_date(name, yr)
         if not qual and hd and hd < now.date():
             hd = get_holiday_date(name, now.year + 1)
         if hd:
-            return str(hd)
-
-    # skip unless date-like hint present
-    if not re.search(
-        r'\b(?:by\s+)?(?:mon(?:day)?|tue(?:sday)?|wed(?:nesday)?|'
-        r'thu(?:rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?|'
-        r'january|february|march|april|may|june|july|august|'
-        r'september|october|november|december|next|last|'
-        r'tomorrow|yesterday|\d+(?:st|nd|rd|th))\b', txt
-    ):
-        return None
+            return hd
 
     # ordinals + months
-    mn = [calendar.month_name[i] for i in range(1, 13)]
-    exp = re.search(rf'\b(\d{{1,2}})(?:st|nd|rd|th)(?:\s+of)?\s+({"|".join(mn)})\b', text, re.IGNORECASE)
+    exp = rules.get('explicit')
     if exp:
-        p = dateparser.parse(exp.group(0), settings={'RELATIVE_BASE': now})
-        if p:
-            return str(p.date())
+        try:
+            return date(now.year, MONTH_IDX[exp['exp_month'].lower()], int(exp['exp_day']))
+        except ValueError:
+            # out-of-range days ("29th of february", "32nd of may") keep dateparser's reading
+            p = cached_dateparse(exp.group(0), now)
+            if p:
+                return p.date()
 
     # by weekday
-    by = re.search(r'\bby\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', txt)
+    by = rules.get('by')
     if by:
-        b = dateparser.parse(by.group(1), settings={'RELATIVE_BASE': now, 'PREFER_DATES_FROM':'future'})
-        if b:
-            return str(b.date())
+        return next_weekday(now, by['by_wd'].lower())
 
     # after next weekday
-    aft = re.search(r'\bafter\s+next\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', txt)
+    aft = rules.get('after_next')
     if aft:
-        w = dateparser.parse(aft.group(1), settings={'RELATIVE_BASE': now, 'PREFER_DATES_FROM':'future'})
-        if w:
-            return str((w + timedelta(days=7)).date())
+        return next_weekday(now, aft['aft_wd'].lower()) + timedelta(days=7)
 
     # before next/last weekday
-    bf = re.search(r'\bbefore\s+(next|last)\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', txt)
+    bf = rules.get('before')
     if bf:
-        qual, wd = bf.group(1), bf.group(2)
-        base = dateparser.parse(wd, settings={'RELATIVE_BASE': now, 'PREFER_DATES_FROM':'future'})
-        if base:
-            delta = timedelta(days=7)
-            return str((base + delta if qual=='next' else base - delta).date())
+        qual, wd = bf['bf_qual'].lower(), bf['bf_wd'].lower()
+        base = next_weekday(now, wd)
+        delta = timedelta(days=7)
+        return base + delta if qual=='next' else base - delta
+
+    # skip the NLP fallbacks unless a date-like hint is present (the rules above
+    # all contain one, so checking here instead of up front changes nothing)
+    if not DATE_HINT_RE.search(text):
+        return None
 
     # SpaCy date ents
-    doc = nlp(text)
+    if doc is None:
+        doc = get_doc(text)
     for ent in doc.ents:
-        if ent.label_ == 'DATE' and 'other day' not in ent.text.lower():
-            p = dateparser.parse(ent.text, settings={'RELATIVE_BASE': now, 'PREFER_DATES_FROM':'future'})
+        if ent.label_ == 'DATE' and not OTHER_DAY_RE.search(ent.text):
+            p = parse_date_text(ent.text, now)
             if p:
-                return str(p.date())
+                return p
 
     # fuzzy fallback
     results = search_dates(text, settings={'RELATIVE_BASE': now})
     if results:
         for m, dt in results:
-            if 'other day' not in m.lower():
-                return str(dt.date())
+            if not OTHER_DAY_RE.search(m):
+                return dt.date()
 
     return None
 
-def parse_form(text):
-    t = extract_task_type(text)
+def needs_nlp(text):
+    # cheap guess at whether a spaCy fallback will fire: no category keyword (noun
+    # fallback) or a date hint none of the date rules resolve (DATE ents); a wrong
+    # "no" only means extract_asset/extract_date parse lazily through get_doc()
+    if USE_SPACY_NOUNS and not category_hits(text):
+        return True
+    return bool(DATE_HINT_RE.search(text)) and not DATE_RE.search(text)
+
+def parse_form(text, doc=None, now=None):
+    # relative dates ("by friday") move with the calendar, so the day is part of the key
+    if now is None:
+        now = datetime.now()
+    return parse_form_cached(text, now.date().toordinal(), doc, now)
+
+# Streamlit reruns the whole script on every widget event; cache parses across reruns
+# (leading underscores keep the spaCy Doc and the exact clock time out of the cache key).
+# Keyed by day, so the first parse of a line each day fixes its result until midnight:
+# sub-day phrases ("in 3 hours", "tonight") keep that click's reading
+@st.cache_data(max_entries=10_000, show_spinner=False)
+def parse_form_cached(text, day, _doc=None, _now=None):
+    t = extract_task_type(text)  # lowercase TASK_CATEGORIES key, capitalized for display
     return {
-        'task_type': t,
+        'task_type': t.capitalize(),
         'location':  extract_location(text),
-        'asset':     extract_asset(text, t),
+        'asset':     extract_asset(text, t, _doc),
         'priority':  extract_priority(text),
-        'date':      extract_date(text)
+        'date':      extract_date(text, _doc, _now)
     }
 
 # Streamlit UI
@@ -272,7 +465,15 @@ if st.button("parse"):
     else:
         st.subheader("parsed output:")
         lines = [l.strip() for l in user_input.splitlines() if l.strip()]
-        for i, line in enumerate(lines, 1):
-            result = parse_form(line)
-            st.markdown(f"• **{i}.** `{line}`")
-            st.json(result)
+        now = datetime.now()  # one reference time for the whole batch
+        # only new lines that will hit a spaCy fallback are batch-parsed: repeats are
+        # piped once, and lines parsed earlier today come out of parse_form's cache
+        # (should it have evicted one, get_doc() parses it lazily)
+        day = now.date().toordinal()
+        seen = st.session_state.setdefault('parsed_lines', set())
+        todo = [line for line in dict.fromkeys(lines) if (line, day) not in seen and needs_nlp(line)]
+        docs = dict(zip(todo, load_nlp().pipe(todo, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS))) if todo else {}
+        # one table instead of a markdown + json element per line
+        rows = [{'sentence': line, **parse_form(line, docs.get(line), now)} for line in lines]
+        seen.update((line, day) for line in lines)
+        st.dataframe(rows)